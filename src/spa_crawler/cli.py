@@ -1,120 +1,273 @@
 import argparse
-import asyncio
-import json
+import logging
+import sys
 from pathlib import Path
-from .crawler import SpaCrawler
+from typing import Iterator
+from .utils import loads_json
+
+try:
+    import ijson  # picks the yajl2_c backend automatically when it is built
+except ImportError:  # optional; the URLs file is then loaded in one go
+    ijson = None
+
+# Keys that hold a URL string, and keys whose list values are searched for more URLs
+_URL_KEYS = frozenset(("url", "href", "loc", "link"))
+_LIST_KEYS = frozenset(("urls", "links", "items", "pages"))
+
+_TRUTHY = frozenset(("true", "1", "yes", "y", "on"))
+_FALSY = frozenset(("false", "0", "no", "n", "off"))
+
+def _parse_bool(value: str) -> bool:
+    # argparse type for the true/false flags, so args already hold bools
+    v = value.strip().lower()
+    if v in _TRUTHY:
+        return True
+    if v in _FALSY:
+        return False
+    raise argparse.ArgumentTypeError(f"expected true/false, got {value!r}")
+
+def _iter_stream_urls(f) -> Iterator[str]:
+    # Event-driven parse that never materializes the JSON tree and dedups inline.
+    # Follows the same rules and order as _walk_urls(): strings are taken from lists
+    # and from the URL keys of dicts, dicts are only descended through _LIST_KEYS, and
+    # a dict's own URL keys come before the URLs of its nested lists. Lists outside any
+    # dict stream straight through; output under a dict is held until that dict closes.
+    seen = set()
+    stack = []  # [is_list, reachable, urls, nested_urls] for each open container
+    open_dicts = 0  # reachable dicts currently open; while > 0 output is buffered
+    key = None
+    for event, value in ijson.basic_parse(f):
+        if event == "map_key":
+            key = value
+            continue
+        if event == "end_map" or event == "end_array":
+            is_list, reachable, urls, nested = stack.pop()
+            if not reachable:
+                continue
+            if not is_list:
+                open_dicts -= 1
+                urls.extend(nested)
+            if stack and not stack[-1][0]:
+                stack[-1][3].extend(urls)
+            elif open_dicts:
+                stack[-1][2].extend(urls)
+            else:
+                for url in urls:
+                    if url not in seen:
+                        seen.add(url)
+                        yield url
+            continue
+        if stack:
+            in_list, reachable = stack[-1][0], stack[-1][1]
+        else:
+            in_list, reachable = True, True
+        if event == "string":
+            if reachable and (in_list or key in _URL_KEYS):
+                if open_dicts:
+                    stack[-1][2].append(value)
+                elif value not in seen:
+                    seen.add(value)
+                    yield value
+        elif event == "start_array":
+            stack.append([True, reachable and (in_list or key in _LIST_KEYS), [], None])
+        elif event == "start_map":
+            reachable = reachable and in_list
+            stack.append([False, reachable, [], []])
+            if reachable:
+                open_dicts += 1
+
+def _stream_urls(path: Path) -> list:
+    with path.open("rb") as f:
+        return list(_iter_stream_urls(f))
+
+def _load_urls(path: Path) -> list:
+    return _walk_urls(loads_json(path.read_bytes()))
+
+def _walk_urls(data) -> list:
+    # Fast path for the most common shape, a flat array of URL strings: the
+    # type check and the order-preserving dedup both run in C
+    if type(data) is list and set(map(type, data)) <= {str}:
+        return list(dict.fromkeys(data))
+    # Dedup happens during the walk, so no intermediate URL list is built
+    seen = set()
+    deduped: list[str] = []
+    # Locals turn the hot-loop global/attribute lookups into LOAD_FAST
+    _type, _list, _dict, _str, _reversed = type, list, dict, str, reversed
+    url_keys, list_keys = _URL_KEYS, _LIST_KEYS
+    seen_add = seen.add
+    deduped_append = deduped.append
+    # Iterative depth-first walk; children are pushed in reverse so URLs keep document order
+    stack = [data]
+    stack_pop = stack.pop
+    stack_extend = stack.extend
+    while stack:
+        obj = stack_pop()
+        t = _type(obj)
+        if t is _list:
+            stack_extend(_reversed(obj))
+        elif t is _dict:
+            # One pass over the dict: URL-bearing keys are emitted, nested arrays are queued
+            nested = []
+            for k, v in obj.items():
+                if k in url_keys:
+                    if _type(v) is _str and v not in seen:
+                        seen_add(v)
+                        deduped_append(v)
+                elif k in list_keys and _type(v) is _list:
+                    nested.append(v)
+            stack_extend(_reversed(nested))
+        elif t is _str and obj not in seen:
+            seen_add(obj)
+            deduped_append(obj)
+    return deduped
+
+def _iter_jobs_file(f) -> Iterator[str]:
+    # Lazily yields URLs from an open jobs file and closes it once exhausted
+    with f:
+        if ijson is not None:
+            yield from _iter_stream_urls(f)
+        else:
+            yield from _walk_urls(loads_json(f.read()))
 
 def main():
     parser = argparse.ArgumentParser(description="Crawl a React SPA and export discovered links.")
     parser.add_argument("--start-url", required=False, help="Starting URL of the SPA.")
     parser.add_argument("--urls-file", required=False, help="Path to a JSON file containing a list of URLs (e.g., outputs/sitemap.json).")
+    parser.add_argument("--jobs-file", required=False, help="Like --urls-file, but URLs are handed to the crawler while the file is still being parsed.")
     parser.add_argument("--no-discover", action="store_true", help="Do not discover new links; only visit the provided URLs.")
     parser.add_argument("--out", default="outputs/sitemap.json", help="Path to JSON output.")
-    parser.add_argument("--same-origin", type=str, default="true", help="Limit to same origin (true/false).")
+    parser.add_argument("--indent", type=int, default=0, help="Indent the JSON output by N spaces (0 writes compact JSON).")
+    parser.add_argument("--same-origin", type=_parse_bool, default=True, help="Limit to same origin (true/false).")
     parser.add_argument("--concurrency", type=int, default=5)
     parser.add_argument("--max-pages", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=None, help="Optional: do not follow links more than N clicks away from the start URLs.")
     parser.add_argument("--timeout-ms", type=int, default=20000)
-    parser.add_argument("--headless", type=str, default="true")
-    parser.add_argument("--wait-until", type=str, default="networkidle", choices=["load","domcontentloaded","networkidle"])
-    parser.add_argument("--scrape", type=str, default="true", help="Scrape page content and include it in the JSON (true/false).")
+    parser.add_argument("--headless", type=_parse_bool, default=True)
+    parser.add_argument("--wait-until", type=str, default="domcontentloaded", choices=["load","domcontentloaded","networkidle"])
+    parser.add_argument("--scrape", type=_parse_bool, default=True, help="Scrape page content and include it in the JSON (true/false).")
     parser.add_argument("--markdown-out", type=str, default=None, help="Optional: path to write a combined Markdown file of all pages.")
+    parser.add_argument("--jsonl-out", type=str, default=None, help="Optional: stream each page record to this JSONL file as it finishes, keeping scraped text out of memory.")
     parser.add_argument("--wait-selector", type=str, default=None, help="CSS selector to wait for before extracting content.")
-    parser.add_argument("--wait-text-growth-ms", type=int, default=0, help="Poll for text growth up to N milliseconds (dynamic content).")
-    parser.add_argument("--include-html", type=str, default="false", help="Include raw HTML for each page (true/false).")
-    parser.add_argument("--retry-failed", type=str, default="true", help="Automatically retry timed-out URLs with doubled timeout (true/false).")
-    parser.add_argument("--log-console", type=str, default="false", help="Print page console warnings/errors and runtime errors (true/false).")
-    parser.add_argument("--log-network", type=str, default="false", help="Print network responses with status >= 400 (true/false).")
+    parser.add_argument("--wait-text-growth-ms", type=int, default=0, help="Wait up to N milliseconds for text to keep growing (dynamic content); ends early once text stops growing for 1s.")
+    parser.add_argument("--include-html", type=_parse_bool, default=False, help="Include raw HTML for each page (true/false).")
+    parser.add_argument("--retry-failed", type=_parse_bool, default=True, help="Automatically retry timed-out URLs with doubled timeout (true/false).")
+    parser.add_argument("--max-retries", type=int, default=1, help="Retries per timed-out URL; each attempt doubles the timeouts.")
+    parser.add_argument("--max-timeout-ms", type=int, default=120_000, help="Upper bound for the doubled per-attempt timeouts.")
+    parser.add_argument("--log-console", type=_parse_bool, default=False, help="Print page console warnings/errors and runtime errors (true/false).")
+    parser.add_argument("--log-network", type=_parse_bool, default=False, help="Print network responses with status >= 400 (true/false).")
+    parser.add_argument("--user-data-dir", type=str, default=None, help="Optional: browser profile directory reused across runs so cached JS bundles and assets are not re-downloaded. The HTTP cache is bypassed when combined with --block-resources/--block-trackers.")
+    parser.add_argument("--debug", type=_parse_bool, default=False, help="Log full tracebacks for pages that fail (true/false).")
+    parser.add_argument("--block-resources", type=str, nargs="?", default="", const="image,font,media", help="Comma-separated Playwright resource types to abort; without a value blocks image,font,media.")
+    parser.add_argument("--block-trackers", type=_parse_bool, default=False, help="Abort requests to common analytics/ads hosts (true/false).")
+    parser.add_argument("--static-fast-path", type=_parse_bool, default=False, help="Fetch pages over plain HTTP first and only render SPA-looking pages in the browser (true/false, requires httpx).")
 
     args = parser.parse_args()
 
-    if not args.start_url and not args.urls_file:
-        parser.error("You must provide either --start-url or --urls-file")
+    if not args.start_url and not args.urls_file and not args.jobs_file:
+        parser.error("You must provide either --start-url, --urls-file or --jobs-file")
+    if args.urls_file and args.jobs_file:
+        parser.error("--urls-file and --jobs-file cannot be combined")
 
-    same_origin = args.same_origin.lower() == "true"
-    headless = args.headless.lower() == "true"
-    scrape = args.scrape.lower() == "true"
-    include_html = args.include_html.lower() == "true"
-    retry_failed = args.retry_failed.lower() == "true"
-    log_console = args.log_console.lower() == "true"
-    log_network = args.log_network.lower() == "true"
+    # Output files usually share a directory; create each parent only once
+    ensured_dirs = set()
+    def ensure_parent(path: Path):
+        d = path.parent
+        if d not in ensured_dirs:
+            d.mkdir(parents=True, exist_ok=True)
+            ensured_dirs.add(d)
 
     out_json = Path(args.out)
-    out_json.parent.mkdir(parents=True, exist_ok=True)
+    ensure_parent(out_json)
+    if args.jsonl_out:
+        ensure_parent(Path(args.jsonl_out))
 
     # Load URLs from file if provided
     start_urls = None
     if args.urls_file:
         p = Path(args.urls_file)
-        if not p.exists():
-            parser.error(f"URLs file not found: {args.urls_file}")
         try:
-            data = json.loads(p.read_text(encoding="utf-8"))
+            start_urls = _stream_urls(p) if ijson is not None else _load_urls(p)
+        except FileNotFoundError:
+            parser.error(f"URLs file not found: {args.urls_file}")
         except Exception as e:
             parser.error(f"Failed to parse URLs file: {e}")
-        urls: list[str] = []
-        def collect_from(obj):
-            nonlocal urls
-            if isinstance(obj, list):
-                for item in obj:
-                    collect_from(item)
-            elif isinstance(obj, dict):
-                # common keys that may hold URLs
-                for key in ("url", "href", "loc", "link"):  # sitemap variants
-                    v = obj.get(key)
-                    if isinstance(v, str):
-                        urls.append(v)
-                # nested arrays commonly used
-                for key in ("urls", "links", "items", "pages"):
-                    if key in obj and isinstance(obj[key], list):
-                        collect_from(obj[key])
-            elif isinstance(obj, str):
-                urls.append(obj)
-        collect_from(data)
-        # de-duplicate while preserving order
-        seen = set()
-        deduped = []
-        for u in urls:
-            if not isinstance(u, str):
-                continue
-            if u not in seen:
-                seen.add(u)
-                deduped.append(u)
-        start_urls = deduped
-
-    crawler = SpaCrawler(
-        start_url=args.start_url,
-        start_urls=start_urls,
-        same_origin_only=same_origin,
-        max_pages=args.max_pages,
-        concurrency=args.concurrency,
-        timeout_ms=args.timeout_ms,
-        wait_until=args.wait_until,
-        headless=headless,
-        scrape_content=scrape,
-        wait_selector=args.wait_selector,
-        wait_text_growth_ms=args.wait_text_growth_ms,
-        include_html=include_html,
-        log_network=log_network,
-        log_console=log_console,
-        discover_links=(not args.no_discover),
-        retry_failed=retry_failed,
-    )
-
-    asyncio.run(crawler.run())
-
-    data = crawler.to_json()
-    with out_json.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    # Stream URLs from a jobs file so crawling starts before parsing finishes
+    url_source = None
+    if args.jobs_file:
+        try:
+            url_source = _iter_jobs_file(open(args.jobs_file, "rb"))
+        except FileNotFoundError:
+            parser.error(f"Jobs file not found: {args.jobs_file}")
+        except OSError as e:
+            parser.error(f"Failed to open jobs file: {e}")
+
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("spa_crawler").setLevel(logging.DEBUG if args.debug else logging.INFO)
+
+    # Imported late so --help and argument errors never load Playwright
+    import asyncio
+    from .crawler import SpaCrawler
+
+    try:
+        crawler = SpaCrawler(
+            start_url=args.start_url,
+            start_urls=start_urls,
+            url_source=url_source,
+            same_origin_only=args.same_origin,
+            max_pages=args.max_pages,
+            concurrency=args.concurrency,
+            timeout_ms=args.timeout_ms,
+            wait_until=args.wait_until,
+            headless=args.headless,
+            scrape_content=args.scrape,
+            wait_selector=args.wait_selector,
+            wait_text_growth_ms=args.wait_text_growth_ms,
+            include_html=args.include_html,
+            log_network=args.log_network,
+            log_console=args.log_console,
+            discover_links=(not args.no_discover),
+            retry_failed=args.retry_failed,
+            max_retries=args.max_retries,
+            max_timeout_ms=args.max_timeout_ms,
+            static_fast_path=args.static_fast_path,
+            block_resources=[t.strip() for t in args.block_resources.split(",") if t.strip()],
+            block_trackers=args.block_trackers,
+            results_path=args.jsonl_out,
+            user_data_dir=args.user_data_dir,
+            max_depth=args.max_depth,
+        )
+    except ImportError as e:
+        parser.error(str(e))
+
+    # libuv-based loop makes the many small Playwright IPC awaits cheaper; not available on Windows
+    uvloop = None
+    if sys.platform != "win32":
+        try:
+            import uvloop
+        except ImportError:
+            pass
+    if uvloop is not None:
+        # uvloop.run() builds the loop directly; uvloop.install() goes through the deprecated loop-policy API
+        uvloop.run(crawler.run())
+    else:
+        asyncio.run(crawler.run())
+
+    # Records are serialized one at a time instead of building the whole document first
+    with out_json.open("wb") as f:
+        crawler.stream_json(f, indent=args.indent)
 
     # Optionally write markdown aggregation
     if args.markdown_out:
         md_path = Path(args.markdown_out)
-        md_path.parent.mkdir(parents=True, exist_ok=True)
-        def to_md(item):
-            title = item.get("title") or item.get("url")
-            body = item.get("text") or ""
-            return f"# {title}\n\nURL: {item.get('url')}\n\n{body}\n\n---\n\n"
-        content = "".join(to_md(item) for item in data)
-        md_path.write_text(content, encoding="utf-8")
+        ensure_parent(md_path)
+        # Stream one page at a time instead of joining the whole document in memory
+        with md_path.open("wb") as f:
+            write = f.write
+            for r in crawler.iter_records():
+                url = r["url"]
+                title = r["title"] or url
+                body = r["text"] or ""
+                write(f"# {title}\n\nURL: {url}\n\n{body}\n\n---\n\n".encode("utf-8"))
 
     print(f"Wrote {len(crawler.results)} pages to {out_json}{' and ' + args.markdown_out if args.markdown_out else ''}")
@@ -1,11 +1,276 @@
 import asyncio
-from typing import Set, Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+from functools import lru_cache
+from itertools import chain, count
+from typing import Set, Dict, List, Optional, Tuple, Iterable, Iterator, Union
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from bs4 import BeautifulSoup
 from tqdm import tqdm
 from playwright.async_api import async_playwright
-from .utils import canonicalize, absolutize, same_origin
+from .utils import canonicalize, absolutize, origin_key, dumps_json, loads_json
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+except ImportError:  # only needed for static_fast_path
+    httpx = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # optional C parser; BeautifulSoup is the fallback
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (only probed so BeautifulSoup can use the C-backed tree builder)
+    _BS4_FEATURES = "lxml"
+except ImportError:
+    _BS4_FEATURES = "html.parser"
+
+# Client-side mount points; when one is (nearly) empty in the served HTML the page needs JS
+_SPA_MOUNT_SELECTORS = "#root, #app, #__next, [data-reactroot]"
+# Below this much server-rendered text a page is rendered in the browser instead
+_STATIC_MIN_TEXT_CHARS = 200
+# URLs past these limits are treated as crawler traps and never queued
+_TRAP_MAX_URL_LEN = 2048
+_TRAP_MAX_SEGMENTS = 30
+# Times a path segment, or a run of segments, may appear back to back before the URL counts as a loop
+_TRAP_MAX_REPEATS = 3
+# Queue priority of the worker stop sentinels; above any real depth
+_STOP_DEPTH = float("inf")
+# The text-growth window ends early once body text has not grown for this long
+_GROWTH_SETTLE_MS = 1000
+
+_WS_RE = re.compile(r"\s+")
+_SAFE_NAME_RE = re.compile(r"[^a-zA-Z0-9_-]+")
+
+# Resource types that cost bandwidth and paint time but never carry text or links
+_DEFAULT_BLOCKED_TYPES = frozenset({"image", "font", "media"})
+
+# Third-party analytics/ads hosts that never contribute page content; matched against the request hostname
+# (the host itself or any subdomain), never the full URL
+_TRACKER_RE = re.compile(r"(?:^|\.)(?:google-analytics\.com|googletagmanager\.com|doubleclick\.net|cdn\.segment\.com|api\.segment\.io|hotjar\.com|mixpanel\.com|connect\.facebook\.net)$")
+
+@lru_cache(maxsize=65536)
+def _resolve_link(base: str, href: str) -> str:
+    # Pages of one site share navigation, so the same (base, href) pairs recur constantly
+    try:
+        return canonicalize(absolutize(base, href))
+    except ValueError:
+        # An href with a bad port or a broken IPv6 host is dropped, like an empty one
+        return ""
+
+def _soup_text(soup) -> str:
+    # Text of a parsed document with script/style/noscript removed (mutates the soup)
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return soup.get_text(separator=" ")
+
+def _html_to_text(html: str) -> str:
+    # Readable text of an HTML document with script/style/noscript removed
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        tree.strip_tags(["script", "style", "noscript"])
+        node = tree.body or tree.root
+        return node.text(separator=" ") if node is not None else ""
+    return _soup_text(BeautifulSoup(html, _BS4_FEATURES))
+
+def _parse_static(html: str, url: str, wait_selector: Optional[str]) -> Optional[Tuple[Optional[str], List[str], str]]:
+    # (title, links, normalized text) of a server-rendered page, or None when it needs the browser
+    soup = BeautifulSoup(html, _BS4_FEATURES)
+    # An empty framework mount point means the content is rendered client-side
+    for el in soup.select(_SPA_MOUNT_SELECTORS):
+        if len(el.get_text(strip=True)) < 50:
+            return None
+    if wait_selector and soup.select_one(wait_selector) is None:
+        return None
+    title = soup.title.get_text(strip=True) if soup.title else None
+    base = url
+    base_tag = soup.find("base", href=True)
+    if base_tag:
+        base = absolutize(base, base_tag["href"])
+    links: List[str] = []
+    seen = set()
+    for a in soup.find_all("a", href=True):
+        abs_url = _resolve_link(base, a["href"])
+        if abs_url and abs_url not in seen:
+            seen.add(abs_url)
+            links.append(abs_url)
+    norm = _WS_RE.sub(" ", _soup_text(soup)).strip()
+    if len(norm) < _STATIC_MIN_TEXT_CHARS:
+        return None
+    return title, links, norm
+
+def _looks_like_trap(url: str) -> bool:
+    # Calendar/session/relative-link loops produce very long URLs or keep repeating path segments
+    if len(url) > _TRAP_MAX_URL_LEN:
+        return True
+    path = urlsplit(url).path
+    segments = [seg for seg in path.split("/") if seg]
+    n = len(segments)
+    if n > _TRAP_MAX_SEGMENTS:
+        return True
+    # A loop is a run of k segments repeated back to back (/a/a/a for k=1, /a/b/a/b/a/b for k=2): segments[j]
+    # then equals segments[j + k] for k * (repeats - 1) positions in a row. Segments that merely recur
+    # (/src/main/java/x/main/java) are not a loop
+    for k in range(1, n // _TRAP_MAX_REPEATS + 1):
+        run = 0
+        for j in range(n - k):
+            if segments[j] == segments[j + k]:
+                run += 1
+                if run >= k * (_TRAP_MAX_REPEATS - 1):
+                    return True
+            else:
+                run = 0
+    return False
+
+# Enhanced link extraction for React SPAs
+_EXTRACT_LINKS_JS = """
+() => {
+    const links = new Set();
+    // Compiled once per call rather than per element/attribute
+    const onclickRe = /(?:href|url|link)\\s*=\\s*['"]([^'"]+)['"]/;
+    const urlRe = /^(https?:\\/\\/|\\/).+/;
+    // Anchors whose href was already taken in step 1
+    const captured = new WeakSet();
+
+    // 1. Traditional anchor tags
+    document.querySelectorAll('a[href]').forEach(a => {
+        const href = a.getAttribute('href');
+        if (href) links.add(href);
+        captured.add(a);
+    });
+
+    // 2. React Router links (onClick handlers, data attributes)
+    document.querySelectorAll('[data-href], [data-url], [data-link]').forEach(el => {
+        const href = el.getAttribute('data-href') || 
+                    el.getAttribute('data-url') || 
+                    el.getAttribute('data-link');
+        if (href) links.add(href);
+    });
+
+    // 3. Look for href in onclick attributes
+    document.querySelectorAll('[onclick]').forEach(el => {
+        const onclick = el.getAttribute('onclick') || '';
+        const match = onclickRe.exec(onclick);
+        if (match) links.add(match[1]);
+    });
+
+    // 4. Check for React Router style links (href="#/..." or href="/...")
+    document.querySelectorAll('a, [role="link"], button').forEach(el => {
+        const seen = captured.has(el);
+        if (!seen) {
+            const href = el.getAttribute('href');
+            if (href) links.add(href);
+        }
+        // Check for data attributes that might contain URLs
+        for (const attr of el.attributes) {
+            if (seen && attr.name === 'href') continue;
+            const v = attr.value;
+            // Cheap first-character test ('/' or 'http') before running the regex
+            if (!v || (v.charCodeAt(0) !== 47 && !v.startsWith('http'))) continue;
+            if (urlRe.test(v)) links.add(v);
+        }
+    });
+
+    return Array.from(links);
+}
+"""
+
+# Extract visible text from React SPA after JS execution
+_EXTRACT_TEXT_JS = """
+(cap) => {
+  // Collapse whitespace and truncate in the page so at most `cap` chars cross the driver pipe
+  const finish = (t) => (t || '').replace(/\\s+/g, ' ').trim().slice(0, cap);
+
+  // Helper to get text from an element
+  const getText = (root) => {
+    if (!root) return '';
+    // Try innerText first (includes visible text only)
+    if (root.innerText) return root.innerText.trim();
+    // Fallback to textContent
+    if (root.textContent) return root.textContent.trim();
+    return '';
+  };
+
+  // Try specific selectors first (common React app containers)
+  const selectors = [
+    '#root', '#app', '#__next', '[data-reactroot]',
+    'article', 'main', '[role="main"]', '[role="article"]',
+    '.article', '.content', '.post', '.entry-content',
+    '.kb-article', '.knowledge-base-article', '.kbContent', '.z_kb',
+    '.article-body', '.article-content', '.post-content', '.page-content'
+  ];
+
+  let parts = [];
+
+  // One pass over the DOM for all selectors (matches come back in document order)
+  for (const el of document.querySelectorAll(selectors.join(','))) {
+    const t = getText(el);
+    if (t && t.length > 100) { // Only meaningful content
+      parts.push(t);
+    }
+  }
+
+  // If we found content in specific areas, use that
+  if (parts.length > 0) {
+    // Deduplicate (child content might be repeated)
+    const unique = [...new Set(parts)];
+    return finish(unique.join('\\n\\n'));
+  }
+
+  // Fallback: get all text from body, but filter out nav/header/footer
+  const body = document.body;
+  if (!body) return '';
+
+  // Skip noise elements with a walker over the live tree instead of cloning and pruning it;
+  // rejecting an element skips its whole subtree
+  const noise = 'script, style, noscript, nav, header, footer, .nav, .header, .footer, .sidebar, .menu';
+  const walker = document.createTreeWalker(body, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+    acceptNode: (n) => (n.nodeType === 1 && n.matches(noise)) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+  });
+  const chunks = [];
+  for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+    if (n.nodeType === 3) chunks.push(n.data);
+  }
+
+  // Same text a detached clone's innerText gave (detached nodes fall back to textContent)
+  const bodyText = chunks.join('').trim();
+  return finish(bodyText || getText(body));
+}
+"""
+
+# Defined once per context so each page/frame evaluation only ships a short call
+_INIT_SCRIPT = f"window.__spaExtractLinks = {_EXTRACT_LINKS_JS};\nwindow.__spaExtractText = {_EXTRACT_TEXT_JS};"
+
+# Title, links, text and body length of a frame in a single evaluation; `null` when the extractors are missing
+_EXTRACT_FRAME_TEMPLATE = """
+(opts) => {{
+  const extractLinks = {links};
+  const extractText = {text};
+  if (!extractLinks || !extractText) return null;
+  return {{
+    title: document.title,
+    links: opts.links ? extractLinks() : [],
+    text: opts.text ? extractText(opts.cap) : '',
+    bodyLen: (opts.bodyLen && document.body) ? document.body.innerText.length : 0
+  }};
+}}
+"""
+_CALL_EXTRACT_FRAME_JS = _EXTRACT_FRAME_TEMPLATE.format(links="window.__spaExtractLinks", text="window.__spaExtractText")
+# Ships the full extractor source; only used when the init script did not run in a frame
+_EXTRACT_FRAME_JS = _EXTRACT_FRAME_TEMPLATE.format(links=_EXTRACT_LINKS_JS, text=_EXTRACT_TEXT_JS)
+# Resolves with the new length once body text outgrows `prev`
+_BODY_GREW_JS = "(prev) => { const n = document.body ? document.body.innerText.length : 0; return n > prev ? n : false; }"
+
+# One result is kept per crawled page; slots drop the per-instance __dict__ where supported (3.10+)
+@dataclass(**({"slots": True} if sys.version_info >= (3, 10) else {}))
 class VisitResult:
     url: str
     status: Optional[int]
@@ -14,8 +279,12 @@ class VisitResult:
     text: Optional[str] = None
     raw_html: Optional[str] = None
 
+    def to_dict(self) -> Dict:
+        # Flat fields only, so a shallow dict matches asdict() without its recursive copy
+        return {"url": self.url, "status": self.status, "depth": self.depth, "title": self.title, "text": self.text, "raw_html": self.raw_html}
+
 class SpaCrawler:
-    def __init__(self, start_url: Optional[str] = None, start_urls: Optional[List[str]] = None, same_origin_only: bool = True, max_pages: int = 1000, concurrency: int = 5, timeout_ms: int = 20000, wait_until: str = "networkidle", user_agent: Optional[str] = None, headless: bool = True, extra_headers: Optional[Dict[str, str]] = None, scrape_content: bool = False, max_text_chars: int = 100_000, wait_selector: Optional[str] = None, wait_text_growth_ms: int = 0, include_html: bool = False, screenshot_dir: Optional[str] = None, log_network: bool = False, log_console: bool = False, discover_links: bool = True, retry_failed: bool = True):
+    def __init__(self, start_url: Optional[str] = None, start_urls: Optional[List[str]] = None, same_origin_only: bool = True, max_pages: int = 1000, concurrency: int = 5, timeout_ms: int = 20000, wait_until: str = "domcontentloaded", user_agent: Optional[str] = None, headless: bool = True, extra_headers: Optional[Dict[str, str]] = None, scrape_content: bool = False, max_text_chars: int = 100_000, wait_selector: Optional[str] = None, wait_text_growth_ms: int = 0, include_html: bool = False, screenshot_dir: Optional[str] = None, log_network: bool = False, log_console: bool = False, discover_links: bool = True, retry_failed: bool = True, max_retries: int = 1, max_timeout_ms: int = 120_000, url_source: Optional[Iterable[str]] = None, static_fast_path: bool = False, block_resources: Union[bool, Iterable[str], None] = None, block_trackers: bool = False, results_path: Optional[str] = None, user_data_dir: Optional[str] = None, max_depth: Optional[int] = None):
         self.start_url = canonicalize(start_url) if start_url else None
         # Normalize and set starting URLs list (prefer start_urls; fall back to start_url)
         initial_urls = start_urls or ([start_url] if start_url else [])
@@ -39,420 +308,591 @@ class SpaCrawler:
         self.log_console = log_console
         self.discover_links = discover_links
         self.retry_failed = retry_failed
+        # Timed-out pages go back on the queue with the timeouts doubled per attempt, up to max_timeout_ms
+        self.max_retries = max_retries if retry_failed else 0
+        self.max_timeout_ms = max(max_timeout_ms, timeout_ms)
+        self._retry_tasks: Set[asyncio.Task] = set()
+        # Optional lazily-consumed source of extra seed URLs (e.g. a streaming file parser)
+        self.url_source = url_source
+        # Try a plain HTTP fetch before launching a page; only SPA-like responses hit the browser
+        if static_fast_path and httpx is None:
+            raise ImportError("static_fast_path requires httpx (pip install httpx)")
+        self.static_fast_path = static_fast_path
+        self._http = None
+        # Resource types (e.g. "image", "font", "media") and tracker hosts aborted before download
+        # True selects the usual heavy types; an iterable names Playwright resource types explicitly
+        self.block_resources: Set[str] = set(_DEFAULT_BLOCKED_TYPES) if block_resources is True else set(block_resources or ())
+        self.block_trackers = block_trackers
 
         # Base origin to compare for same_origin filter (use first start URL if present)
         self.origin_base_url = self.start_urls[0] if self.start_urls else self.start_url
+        self._set_origin(self.origin_base_url)
 
         self.visited: Set[str] = set()
+        # Every URL ever put on the queue; links are deduped against it before queueing
+        self.enqueued: Set[str] = set()
         self.results: List[VisitResult] = []
-        self.failed_urls: List[Tuple[str, int]] = []  # Track URLs that timed out or failed
-        self.queue: asyncio.Queue[Tuple[str, int]] = asyncio.Queue()
+        # When set, full records go to this JSONL file as pages finish and self.results keeps
+        # only url/status/depth/title, so memory no longer grows with scraped text
+        self.results_path = results_path
+        self._results_fp = None
+        # Set once run() has created results_path; until then every record is in self.results
+        self._results_opened = False
+        # A persistent profile keeps the HTTP/code caches across runs; its single context is shared by all workers
+        self.user_data_dir = user_data_dir
+        self._shared_context = None
+        self.failed_urls: List[Tuple[str, int]] = []  # URLs that still timed out after all retries
+        # Shallow pages first: entries are (depth, seq, url, attempt); seq keeps FIFO order within a depth
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = count()
+        self.max_depth = max_depth
 
-    async def _extract_links(self, page) -> List[str]:
-        # Collect links from the main page and all frames (helps with sites that render inside iframes)
-        links: List[str] = []
-        async def collect_from_frame(frame):
-            try:
-                # Enhanced link extraction for React SPAs
-                js_extract = """
-                (() => {
-                    const links = new Set();
-                    const base = window.location.origin;
-                    
-                    // 1. Traditional anchor tags
-                    document.querySelectorAll('a[href]').forEach(a => {
-                        const href = a.getAttribute('href');
-                        if (href) links.add(href);
-                    });
-                    
-                    // 2. React Router links (onClick handlers, data attributes)
-                    document.querySelectorAll('[data-href], [data-url], [data-link]').forEach(el => {
-                        const href = el.getAttribute('data-href') || 
-                                    el.getAttribute('data-url') || 
-                                    el.getAttribute('data-link');
-                        if (href) links.add(href);
-                    });
-                    
-                    // 3. Look for href in onclick attributes
-                    document.querySelectorAll('[onclick]').forEach(el => {
-                        const onclick = el.getAttribute('onclick') || '';
-                        const match = onclick.match(/(?:href|url|link)\\s*=\\s*['"]([^'"]+)['"]/);
-                        if (match) links.add(match[1]);
-                    });
-                    
-                    // 4. Check for React Router style links (href="#/..." or href="/...")
-                    document.querySelectorAll('a, [role="link"], button').forEach(el => {
-                        const href = el.getAttribute('href');
-                        if (href) {
-                            links.add(href);
-                        }
-                        // Check for data attributes that might contain URLs
-                        for (const attr of el.attributes) {
-                            if (attr.value && (attr.value.startsWith('/') || attr.value.startsWith('http'))) {
-                                // Validate it looks like a URL
-                                if (attr.value.match(/^(https?:\\/\\/|\\/).+/)) {
-                                    links.add(attr.value);
-                                }
-                            }
-                        }
-                    });
-                    
-                    return Array.from(links);
-                })()
-                """
-                anchors = await frame.evaluate(js_extract)
-            except Exception:
+    async def _extract_frame(self, page, frame, links: bool, text: bool, body_len: bool) -> Dict:
+        opts = {"links": links, "text": text, "cap": self.max_text_chars, "bodyLen": body_len}
+        try:
+            # Installed by the context init script; evaluate the source only if it is missing
+            data = await frame.evaluate(_CALL_EXTRACT_FRAME_JS, opts)
+            if data is None:
+                data = await frame.evaluate(_EXTRACT_FRAME_JS, opts)
+        except Exception:
+            data = None
+        if data is None:
+            data = {"title": None, "links": [], "text": "", "bodyLen": 0}
+            if links:
                 # Fallback to basic extraction
                 try:
-                    anchors = await frame.eval_on_selector_all(
+                    data["links"] = await frame.eval_on_selector_all(
                         "a[href]", "els => els.map(a => a.getAttribute('href'))"
                     )
                 except Exception:
-                    anchors = []
+                    pass
+        if data["links"]:
             base = frame.url or page.url
-            for href in anchors:
+            found: List[str] = []
+            for href in data["links"]:
                 if href:
-                    abs_url = canonicalize(absolutize(base, href))
+                    abs_url = _resolve_link(base, href)
                     if abs_url:
-                        links.append(abs_url)
+                        found.append(abs_url)
+            data["links"] = found
+        return data
+
+    async def _extract_page(self, page, links: bool, text: bool, body_len: bool = False) -> Dict:
+        # Main page + all frames (helps with sites that render inside iframes), one evaluation per frame, concurrently
+        frames = self._frames(page)
+        per_frame = await asyncio.gather(*(self._extract_frame(page, f, links, text, body_len and f is frames[0]) for f in frames))
+        main = per_frame[0]
+        return {
+            "title": main["title"],
+            # Main-frame-first; duplicates are dropped by _enqueue_links against the enqueued set
+            "links": chain.from_iterable(data["links"] for data in per_frame),
+            "text": "\n".join(data["text"] for data in per_frame if data["text"]),
+            "bodyLen": main["bodyLen"],
+        }
+
+    @staticmethod
+    def _frames(page) -> list:
+        # Main frame first, then any sub-frames
+        main = page.main_frame
+        return [main] + [f for f in page.frames if f is not main]
 
-        await collect_from_frame(page.main_frame)
-        for frame in page.frames:
-            if frame is page.main_frame:
+    def _set_origin(self, base: Optional[str]):
+        # Parsed once so the per-link check is a prefix test, or at worst a cached lookup and a tuple compare
+        self._origin = origin_key(base) if base else None
+        # Links arrive canonicalized (lowercase scheme/host, default port dropped), so anything under this
+        # prefix is same-origin without parsing; the trailing "/" stops "a.com" from matching "a.com.evil"
+        parts = urlsplit(canonicalize(base)) if base else None
+        self._origin_prefix = f"{parts.scheme}://{parts.netloc}/" if parts and parts.netloc else None
+
+    def _enqueue_links(self, links: Iterable[str], depth: int):
+        # The queue is unbounded, so put_nowait never blocks and a page's links cost no event-loop round trips
+        remaining = self.max_pages - len(self.enqueued)
+        if remaining <= 0 or (self.max_depth is not None and depth + 1 > self.max_depth):
+            return
+        enqueued = self.enqueued
+        put = self.queue.put_nowait
+        seq = self._seq
+        check_origin = self.same_origin_only and bool(self.origin_base_url)
+        origin = self._origin
+        prefix = self._origin_prefix
+        for link in links:
+            if link in enqueued:
+                continue
+            # Same result as same_origin(origin_base_url, link), including rejecting host-less URLs
+            if check_origin and not (prefix and link.startswith(prefix)) and (origin is None or origin_key(link) != origin):
                 continue
-            await collect_from_frame(frame)
-        # De-duplicate while preserving order
-        seen = set()
-        unique = []
-        for u in links:
-            if u not in seen:
-                seen.add(u)
-                unique.append(u)
-        return unique
-
-    async def _extract_text_dom(self, page) -> str:
-        # Extract visible text from React SPA after JS execution
+            if _looks_like_trap(link):
+                logger.debug("Skipping likely crawler trap %s", link)
+                continue
+            enqueued.add(link)
+            put((depth + 1, next(seq), link, 0))
+            remaining -= 1
+            if not remaining:
+                break
+
+    async def _visit_static(self, url: str, depth: int) -> Optional[Tuple[Optional[int], Optional[str], Optional[str], Optional[str]]]:
+        # Fetch without a browser; returns None when the page has to be rendered by Playwright
+        if self.screenshot_dir:
+            return None
         try:
-            js = """
-            (() => {
-              // Helper to get text from an element, traversing shadow DOMs
-              const getText = (root) => {
-                if (!root) return '';
-                // Try innerText first (includes visible text only)
-                if (root.innerText) return root.innerText.trim();
-                // Fallback to textContent
-                if (root.textContent) return root.textContent.trim();
-                return '';
-              };
-              
-              // Traverse shadow roots recursively
-              const getAllText = (root, collected = []) => {
-                if (!root) return collected;
-                
-                // Get text from this element
-                const text = getText(root);
-                if (text) collected.push(text);
-                
-                // Check for shadow root
-                if (root.shadowRoot) {
-                  getAllText(root.shadowRoot, collected);
-                }
-                
-                // Recurse into children
-                if (root.children) {
-                  for (const child of root.children) {
-                    getAllText(child, collected);
-                  }
-                }
-                
-                return collected;
-              };
-              
-              // Try specific selectors first (common React app containers)
-              const selectors = [
-                '#root', '#app', '#__next', '[data-reactroot]',
-                'article', 'main', '[role="main"]', '[role="article"]',
-                '.article', '.content', '.post', '.entry-content',
-                '.kb-article', '.knowledge-base-article', '.kbContent', '.z_kb',
-                '.article-body', '.article-content', '.post-content', '.page-content'
-              ];
-              
-              let parts = [];
-              
-              // Try each selector
-              for (const sel of selectors) {
-                const els = document.querySelectorAll(sel);
-                for (const el of els) {
-                  const t = getText(el);
-                  if (t && t.length > 100) { // Only meaningful content
-                    parts.push(t);
-                  }
-                }
-              }
-              
-              // If we found content in specific areas, use that
-              if (parts.length > 0) {
-                // Deduplicate (child content might be repeated)
-                const unique = [...new Set(parts)];
-                return unique.join('\\n\\n');
-              }
-              
-              // Fallback: get all text from body, but filter out nav/header/footer
-              const body = document.body;
-              if (!body) return '';
-              
-              // Remove noise elements
-              const noise = body.querySelectorAll('script, style, nav, header, footer, .nav, .header, .footer, .sidebar, .menu');
-              const tempDiv = body.cloneNode(true);
-              tempDiv.querySelectorAll('script, style, nav, header, footer, .nav, .header, .footer, .sidebar, .menu').forEach(el => el.remove());
-              
-              const bodyText = getText(tempDiv);
-              return bodyText || getText(body) || '';
-            })()
-            """
-            text = await page.evaluate(js)
-            return text or ""
-        except Exception as e:
-            return ""
+            resp = await self._http.get(url)
+            if resp.status_code >= 400 or "html" not in resp.headers.get("content-type", ""):
+                return None
+            html = resp.text
+            # Parsing is pure CPU; keep it off the event loop so other workers' browser traffic is still serviced
+            parsed = await asyncio.to_thread(_parse_static, html, str(resp.url), self.wait_selector)
+        except Exception:
+            # Failed fetch, or a parse error (e.g. a Playwright-only --wait-selector):
+            # let the browser handle the page
+            return None
+        if parsed is None:
+            return None
+        title, links, norm = parsed
+        if self.discover_links:
+            self._enqueue_links(links, depth)
+        if not self.scrape_content:
+            return resp.status_code, None, None, None
+        text = norm[: self.max_text_chars]
+        raw_html = html if self.include_html else None
+        return resp.status_code, title or None, text, raw_html
 
-    async def _visit(self, browser, url: str, depth: int) -> Tuple[Optional[int], Optional[str], Optional[str], Optional[str]]:
+    async def _new_context(self, browser):
         context = await browser.new_context(user_agent=self.user_agent, extra_http_headers=self.extra_headers)
+        await self._prepare_context(context)
+        return context
+
+    async def _prepare_context(self, context):
+        await context.add_init_script(script=_INIT_SCRIPT)
+        if self.block_resources or self.block_trackers:
+            await context.route("**/*", self._route_request)
+
+    async def _route_request(self, route):
+        if self._should_block(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _should_block(self, request) -> bool:
+        resource_type = request.resource_type
+        if resource_type == "document":
+            # Never abort the page being crawled itself, whatever host it is on
+            try:
+                if request.frame.parent_frame is None:
+                    return False
+            except Exception:
+                pass
+        if resource_type in self.block_resources:
+            return True
+        if self.block_trackers:
+            host = urlsplit(request.url).hostname
+            return bool(host and _TRACKER_RE.search(host))
+        return False
+
+    async def _new_page(self, context):
+        # Each worker keeps one page and navigates it; listeners are attached once and report the page's current URL
         page = await context.new_page()
+        if self.log_network:
+            def _on_response(resp):
+                try:
+                    # Only problematic responses are printed; nothing is buffered, and headers are read only for those
+                    status = resp.status
+                    if status and status >= 400:
+                        print(f"[network:{status}] {resp.url} ({resp.headers.get('content-type', '')})")
+                except Exception:
+                    pass
+            page.on("response", _on_response)
+
+        # Log page console and runtime errors when enabled
+        if self.log_console:
+            def _on_console(msg):
+                try:
+                    t = msg.type
+                    # Only surface warnings and errors by default
+                    if t in ("warning", "error"):  # Playwright types: 'log','debug','info','warning','error'
+                        loc = msg.location
+                        where = f"{loc.get('url','') or page.url}:{loc.get('lineNumber','?')}:{loc.get('columnNumber','?')}" if isinstance(loc, dict) else page.url
+                        print(f"[console:{t}] {page.url} :: {where} :: {msg.text}")
+                except Exception:
+                    pass
+            def _on_page_error(err):
+                try:
+                    print(f"[pageerror] {page.url} :: {err}")
+                except Exception:
+                    pass
+            page.on("console", _on_console)
+            page.on("pageerror", _on_page_error)
+        return page
+
+    async def _visit(self, page, url: str, depth: int, attempt: int = 0) -> Optional[Tuple[Optional[int], Optional[str], Optional[str], Optional[str]]]:
+        # Returns None when the page timed out and will be retried
+        scale = 2 ** attempt
+        timeout_ms = min(self.timeout_ms * scale, self.max_timeout_ms)
+        growth_ms = min(self.wait_text_growth_ms * scale, self.max_timeout_ms)
         is_timeout_error = False
         try:
-            network_log: List[Dict] = []
-            if self.log_network:
-                def _on_response(resp):
-                    try:
-                        entry = {
-                            "url": resp.url,
-                            "status": resp.status,
-                            "content_type": resp.headers.get('content-type', '')
-                        }
-                        network_log.append(entry)
-                        # Print only problematic responses to keep noise low
-                        if resp.status and resp.status >= 400:
-                            print(f"[network:{resp.status}] {resp.url} ({entry['content_type']})")
-                    except Exception:
-                        pass
-                page.on("response", _on_response)
-
-            # Log page console and runtime errors when enabled
-            if self.log_console:
-                def _on_console(msg):
-                    try:
-                        t = msg.type
-                        # Only surface warnings and errors by default
-                        if t in ("warning", "error"):  # Playwright types: 'log','debug','info','warning','error'
-                            loc = msg.location
-                            where = f"{loc.get('url','') or page.url}:{loc.get('lineNumber','?')}:{loc.get('columnNumber','?')}" if isinstance(loc, dict) else page.url
-                            print(f"[console:{t}] {url} :: {where} :: {msg.text}")
-                    except Exception:
-                        pass
-                def _on_page_error(err):
-                    try:
-                        print(f"[pageerror] {url} :: {err}")
-                    except Exception:
-                        pass
-                page.on("console", _on_console)
-                page.on("pageerror", _on_page_error)
-            resp = await page.goto(url, timeout=self.timeout_ms, wait_until=self.wait_until)
+            resp = await page.goto(url, timeout=timeout_ms, wait_until=self.wait_until)
             status = resp.status if resp else None
             
-            # For React apps: wait for React to hydrate and render
-            await page.wait_for_timeout(1000)  # Give React time to hydrate
-            
-            # Try to wait for content to appear (but don't fail if timeout)
-            try:
-                await page.wait_for_function(
-                    "() => document.body && document.body.innerText.length > 50",
-                    timeout=5000
-                )
-            except Exception:
-                pass
-            
-            # Optional selector wait (dynamic content)
+            # For React apps, readiness is "rendered content is in the DOM" rather than a fixed
+            # sleep: wait for the requested selector, or else for the body to gain some text
             if self.wait_selector:
                 try:
-                    await page.wait_for_selector(self.wait_selector, timeout=min(self.timeout_ms, 10_000))
+                    await page.wait_for_selector(self.wait_selector, timeout=min(timeout_ms, 10_000))
+                except Exception:
+                    pass
+            else:
+                try:
+                    await page.wait_for_function(
+                        "() => document.body && document.body.innerText.length > 50",
+                        timeout=min(timeout_ms, 5000)
+                    )
                 except Exception:
                     pass
-            
-            # Additional wait for any lazy-loaded content
-            await page.wait_for_timeout(250)
-            if self.discover_links:
-                links = await self._extract_links(page)
-                for link in links:
-                    if self.same_origin_only and self.origin_base_url and not same_origin(self.origin_base_url, link):
-                        continue
-                    if link not in self.visited and len(self.visited) + self.queue.qsize() < self.max_pages:
-                        await self.queue.put((link, depth + 1))
             title = None
             text = None
             raw_html = None
+            if self.discover_links or self.scrape_content:
+                extracted = await self._extract_page(page, self.discover_links, self.scrape_content, body_len=self.scrape_content and growth_ms > 0)
+            if self.discover_links:
+                self._enqueue_links(extracted["links"], depth)
             if self.scrape_content:
+                title = extracted["title"]
                 try:
-                    title = await page.title()
-                except Exception:
-                    title = None
-                try:
-                    # First try DOM-based extraction (innerText from key areas)
-                    dom_text = await self._extract_text_dom(page)
-                    # Extract readable text from main page + all frames
-                    from bs4 import BeautifulSoup
-                    texts: List[str] = []
-                    if dom_text:
-                        texts.append(dom_text)
-                    # main frame
-                    try:
-                        html = await page.content()
-                        soup = BeautifulSoup(html, "html.parser")
-                        for tag in soup(["script", "style", "noscript"]):
-                            tag.decompose()
-                        texts.append(soup.get_text(separator=" "))
-                    except Exception:
-                        pass
-                    # other frames
-                    for frame in page.frames:
-                        if frame is page.main_frame:
-                            continue
+                    raw_text = extracted["text"]
+                    # Optionally wait for growth; the length check runs in the page, not over the wire
+                    if growth_ms > 0:
+                        loop = asyncio.get_running_loop()
+                        deadline = loop.time() + growth_ms / 1000
+                        grew = False
                         try:
-                            fhtml = await frame.content()
-                            fsoup = BeautifulSoup(fhtml, "html.parser")
-                            for tag in fsoup(["script", "style", "noscript"]):
-                                tag.decompose()
-                            texts.append(fsoup.get_text(separator=" "))
+                            body_len = extracted["bodyLen"]
+                            while True:
+                                remaining = (deadline - loop.time()) * 1000
+                                if remaining <= 0:
+                                    break
+                                # Times out (and ends the window) once the text has settled
+                                handle = await page.wait_for_function(_BODY_GREW_JS, arg=body_len, timeout=min(remaining, _GROWTH_SETTLE_MS))
+                                body_len = await handle.json_value()
+                                grew = True
                         except Exception:
-                            continue
-                    raw_text = "\n".join(t for t in texts if t)
-                    # Optionally poll for growth
-                    if self.wait_text_growth_ms > 0:
-                        import time
-                        start = time.time()
-                        last_len = len(raw_text)
-                        while (time.time() - start) * 1000 < self.wait_text_growth_ms:
-                            try:
-                                html2 = await page.content()
-                                from bs4 import BeautifulSoup as _BS
-                                soup2 = _BS(html2, "html.parser")
-                                for tag in soup2(["script", "style", "noscript"]):
-                                    tag.decompose()
-                                new_text = soup2.get_text(separator=" ")
-                                # Prefer growth vs previous value
-                                if len(new_text) > last_len:
-                                    raw_text = new_text
-                                    last_len = len(new_text)
-                            except Exception:
-                                break
-                            await page.wait_for_timeout(200)
-                    # Normalize whitespace
-                    norm = " ".join(raw_text.split())
-                    if len(norm) > self.max_text_chars:
-                        norm = norm[: self.max_text_chars]
-                    text = norm or None
+                            # TimeoutError once the page stops growing
+                            pass
+                        if grew:
+                            # Extract once at the end of the window instead of on every change
+                            new_text = (await self._extract_page(page, False, True))["text"]
+                            if len(new_text) > len(raw_text):
+                                raw_text = new_text
                     if self.include_html:
                         try:
                             raw_html = await page.content()
                         except Exception:
                             raw_html = None
+                    if not raw_text:
+                        # Last resort when the DOM scripts could not run (e.g. evaluate failed); the only HTML parse
+                        # on the browser path, and it reuses the include_html copy instead of transferring it twice
+                        try:
+                            html = raw_html if raw_html is not None else await page.content()
+                            raw_text = await asyncio.to_thread(_html_to_text, html)
+                        except Exception:
+                            pass
+                    # Normalize whitespace
+                    norm = _WS_RE.sub(" ", raw_text).strip()
+                    if len(norm) > self.max_text_chars:
+                        norm = norm[: self.max_text_chars]
+                    text = norm or None
                 except Exception:
                     text = None
             # Optional screenshot
             if self.screenshot_dir:
                 try:
-                    import re, os
-                    os.makedirs(self.screenshot_dir, exist_ok=True)
-                    safe = re.sub(r"[^a-zA-Z0-9_-]+", "_", url)[:200]
-                    path = os.path.join(self.screenshot_dir, f"{safe}.png")
+                    # The slug keeps names readable; the hash keeps long URLs that share a prefix from overwriting each other
+                    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+                    safe = _SAFE_NAME_RE.sub("_", url)[:100]
+                    path = os.path.join(self.screenshot_dir, f"{safe}-{digest}.png")
                     await page.screenshot(path=path, full_page=True)
                 except Exception:
                     pass
             return status, title, text, raw_html
         except Exception as e:
-            import traceback
             # Check if it's a timeout error
             error_str = str(e).lower()
             if 'timeout' in error_str or 'exceeded' in error_str:
                 is_timeout_error = True
-            print(f"Error visiting {url}: {e}")
-            traceback.print_exc()
-            return None, None, None, None
-        finally:
-            # Track failed/timed-out URLs for retry
-            if is_timeout_error and self.retry_failed:
+            if is_timeout_error and attempt < self.max_retries:
+                logger.info("Timed out visiting %s (attempt %d/%d): %s", url, attempt + 1, self.max_retries + 1, e)
+                return None
+            # Tracebacks only at DEBUG; formatting one per failed page is costly on error-heavy crawls
+            logger.warning("Error visiting %s: %s", url, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            if is_timeout_error:
                 self.failed_urls.append((url, depth))
-            await context.close()
+            return None, None, None, None
 
     async def _worker(self, browser, pbar):
-        while True:
+        # One long-lived context and page per worker; each URL is just a navigation of that page.
+        # With a persistent profile the context is shared, so it is neither reset nor replaced here
+        shared = self._shared_context
+        context = shared if shared is not None else await self._new_context(browser)
+        page = None
+        current_origin = None
+        try:
+            while True:
+                depth, _, url, attempt = await self.queue.get()
+                if url is None:
+                    # Sentinel from run(): the queue has been drained
+                    self.queue.task_done()
+                    return
+                try:
+                    if not attempt:
+                        if url in self.visited or len(self.visited) >= self.max_pages:
+                            continue
+                        self.visited.add(url)
+                    result = await self._visit_static(url, depth) if self._http is not None and not attempt else None
+                    if result is None:
+                        # Same-origin pages share cookies as they would in a browser; reset state only when crossing origins
+                        origin = origin_key(url)
+                        if shared is None and current_origin is not None and origin != current_origin:
+                            try:
+                                await context.clear_cookies()
+                                await context.clear_permissions()
+                            except Exception:
+                                pass
+                        current_origin = origin
+                        if page is None or page.is_closed():
+                            try:
+                                page = await self._new_page(context)
+                            except Exception as e:
+                                page = None
+                                if shared is not None:
+                                    # The shared persistent context cannot be relaunched from a worker
+                                    logger.warning("Could not open a page for %s: %s", url, e)
+                                else:
+                                    # Opening a page only fails once the context itself is gone
+                                    logger.warning("Browser context failed on %s: %s; recreating it", url, e)
+                                    try:
+                                        await context.close()
+                                    except Exception:
+                                        pass
+                                    try:
+                                        context = await self._new_context(browser)
+                                        page = await self._new_page(context)
+                                    except Exception as e:
+                                        logger.warning("Could not recreate browser context: %s", e)
+                                        page = None
+                        if page is None:
+                            result = (None, None, None, None)
+                        else:
+                            result = await self._visit(page, url, depth, attempt)
+                        if page is not None and (result is None or result[0] is None):
+                            # A failed page may be crashed or still busy; start the next URL on a fresh one
+                            try:
+                                await page.close()
+                            except Exception:
+                                pass
+                            page = None
+                        if result is None:
+                            # Timed out: requeue after a jittered backoff so other pages keep progressing
+                            self._schedule_retry(url, depth, attempt + 1)
+                            continue
+                    status, title, text, raw_html = result
+                    r = VisitResult(url=url, status=status, depth=depth, title=title, text=text, raw_html=raw_html)
+                    if self._results_fp is not None:
+                        try:
+                            self._results_fp.write(dumps_json(r.to_dict()) + b"\n")
+                        except OSError as e:
+                            # Disk full, file gone: stop streaming and keep this and later records whole in memory
+                            logger.warning("Could not write to %s: %s; keeping remaining results in memory", self.results_path, e)
+                            self._close_results()
+                        else:
+                            r.text = r.raw_html = None
+                    self.results.append(r)
+                    pbar.update(1)
+                finally:
+                    # run() relies on queue.join(), so every item must be marked done
+                    self.queue.task_done()
+        finally:
             try:
-                url, depth = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-            except asyncio.TimeoutError:
-                return
-            if url in self.visited or len(self.visited) >= self.max_pages:
-                self.queue.task_done()
-                continue
-            self.visited.add(url)
-            status, title, text, raw_html = await self._visit(browser, url, depth)
-            self.results.append(VisitResult(url=url, status=status, depth=depth, title=title, text=text, raw_html=raw_html))
-            pbar.update(1)
-            self.queue.task_done()
+                if shared is None:
+                    await context.close()
+                elif page is not None:
+                    await page.close()
+            except Exception:
+                pass
+
+    def _schedule_retry(self, url: str, depth: int, attempt: int):
+        # Tracked so _drain() waits for it; added before task_done() so queue.join() cannot miss it
+        delay = min(2 ** (attempt - 1), 30) * random.uniform(0.5, 1.5)
+        task = asyncio.create_task(self._requeue_later(delay, url, depth, attempt))
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    async def _requeue_later(self, delay: float, url: str, depth: int, attempt: int):
+        await asyncio.sleep(delay)
+        self._put(url, depth, attempt)
+
+    def _close_results(self):
+        fp, self._results_fp = self._results_fp, None
+        try:
+            fp.close()
+        except OSError as e:
+            logger.warning("Could not write to %s: %s", self.results_path, e)
+
+    def _put(self, url: str, depth: int, attempt: int = 0):
+        self.queue.put_nowait((depth, next(self._seq), url, attempt))
+
+    async def _feed(self, source: Iterable[str]):
+        # Enqueue seed URLs as the source yields them so workers can start right away
+        fed = 0
+        try:
+            for u in source:
+                try:
+                    u = canonicalize(u) if isinstance(u, str) else ""
+                except ValueError as e:
+                    # A malformed entry (bad port, broken IPv6 host) only costs that entry
+                    logger.warning("Skipping invalid URL %r: %s", u, e)
+                    continue
+                if not u or u in self.enqueued:
+                    continue
+                self.enqueued.add(u)
+                if self.origin_base_url is None:
+                    self.origin_base_url = u
+                    self._set_origin(u)
+                self._put(u, 0)
+                fed += 1
+                if fed >= self.max_pages:
+                    break
+                if fed % 64 == 0:
+                    # Parsing is synchronous; yield so workers get scheduled
+                    await asyncio.sleep(0)
+        except Exception as e:
+            logger.warning("Error reading URL source: %s", e)
+
+    async def _drain(self, browser, pbar, feeder=None):
+        # Run workers until the queue is empty, then stop them with one sentinel each
+        workers = [asyncio.create_task(self._worker(browser, pbar)) for _ in range(self.concurrency)]
+        if feeder is not None:
+            await feeder
+        while True:
+            await self._join_queue(workers)
+            if not self._retry_tasks:
+                break
+            # Retries still waiting out their backoff will put more work on the queue
+            await asyncio.gather(*self._retry_tasks)
+        for _ in workers:
+            # Sorts after any real entry; url None tells the worker to stop
+            self.queue.put_nowait((_STOP_DEPTH, next(self._seq), None, 0))
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _join_queue(self, workers):
+        # queue.join(), but give up once every worker has died; nothing would consume the rest of the queue
+        alive = {w for w in workers if not w.done()}
+        join = asyncio.ensure_future(self.queue.join())
+        try:
+            while alive:
+                done, _ = await asyncio.wait(alive | {join}, return_when=asyncio.FIRST_COMPLETED)
+                if join in done:
+                    return
+                alive -= done
+        finally:
+            join.cancel()
+        if self.queue.empty():
+            # The last items were marked done as the workers went down
+            return
+        for task in self._retry_tasks:
+            task.cancel()
+        errors = [w.exception() for w in workers if not w.cancelled() and w.exception() is not None]
+        if errors:
+            raise errors[0]
+        raise RuntimeError("All crawl workers stopped before the queue was drained")
 
     async def run(self):
         # Seed initial queue with provided URLs
         if self.start_urls:
             for u in self.start_urls:
-                await self.queue.put((u, 0))
+                if u not in self.enqueued:
+                    self.enqueued.add(u)
+                    self._put(u, 0)
         elif self.start_url:
-            await self.queue.put((self.start_url, 0))
+            self.enqueued.add(self.start_url)
+            self._put(self.start_url, 0)
         
+        if self.static_fast_path:
+            headers = dict(self.extra_headers)
+            if self.user_agent:
+                headers["User-Agent"] = self.user_agent
+            self._http = httpx.AsyncClient(headers=headers, follow_redirects=True, timeout=self.timeout_ms / 1000)
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
+            browser = None
+            if self.user_data_dir:
+                self._shared_context = await p.chromium.launch_persistent_context(self.user_data_dir, headless=self.headless, user_agent=self.user_agent, extra_http_headers=self.extra_headers)
+            else:
+                browser = await p.chromium.launch(headless=self.headless)
             try:
+                if self._shared_context is not None:
+                    if self.block_resources or self.block_trackers:
+                        # Playwright disables the HTTP cache for any context with an active route
+                        logger.warning("Request blocking bypasses the HTTP cache of %s; only the code cache is reused", self.user_data_dir)
+                    await self._prepare_context(self._shared_context)
+                if self.results_path:
+                    self._results_fp = open(self.results_path, "wb")
+                    self._results_opened = True
+                if self.screenshot_dir:
+                    # Created once per run rather than checked on every screenshot
+                    os.makedirs(self.screenshot_dir, exist_ok=True)
                 with tqdm(total=self.max_pages, desc="Crawling", unit="page") as pbar:
-                    workers = [asyncio.create_task(self._worker(browser, pbar)) for _ in range(self.concurrency)]
-                    await self.queue.join()
-                    for w in workers:
-                        w.cancel()
-                    await asyncio.gather(*workers, return_exceptions=True)
+                    feeder = None
+                    if self.url_source is not None:
+                        feeder = asyncio.create_task(self._feed(self.url_source))
+                    await self._drain(browser, pbar, feeder)
                 
-                # Retry failed URLs with doubled timeout and wait_text_growth_ms
-                if self.retry_failed and self.failed_urls:
-                    original_timeout = self.timeout_ms
-                    original_wait_text_growth_ms = self.wait_text_growth_ms
-                    self.timeout_ms = original_timeout * 2
-                    self.wait_text_growth_ms = original_wait_text_growth_ms * 2 if original_wait_text_growth_ms > 0 else 0
-                    retry_count = len(self.failed_urls)
-                    print(f"\n{retry_count} URLs timed out. Retrying with timeout={self.timeout_ms}ms and wait_text_growth_ms={self.wait_text_growth_ms}ms...")
-
-                    # Remove failed URLs from visited set so they can be retried
-                    for url, _ in self.failed_urls:
-                        if url in self.visited:
-                            self.visited.remove(url)
-
-                    # Re-queue failed URLs
-                    for url, depth in self.failed_urls:
-                        await self.queue.put((url, depth))
-
-                    # Clear failed list for this retry round
-                    self.failed_urls.clear()
-
-                    # Run workers again for retry
-                    with tqdm(total=retry_count, desc="Retrying", unit="page") as retry_pbar:
-                        workers = [asyncio.create_task(self._worker(browser, retry_pbar)) for _ in range(self.concurrency)]
-                        await self.queue.join()
-                        for w in workers:
-                            w.cancel()
-                        await asyncio.gather(*workers, return_exceptions=True)
-
-                    # Restore original timeout and wait_text_growth_ms
-                    self.timeout_ms = original_timeout
-                    self.wait_text_growth_ms = original_wait_text_growth_ms
-
-                    if self.failed_urls:
-                        print(f"\n{len(self.failed_urls)} URLs still failed after retry.")
+                if self.failed_urls:
+                    suffix = f" after {self.max_retries} retries" if self.max_retries else ""
+                    print(f"\n{len(self.failed_urls)} URLs timed out{suffix}.")
             finally:
-                await browser.close()
+                if self._shared_context is not None:
+                    await self._shared_context.close()
+                    self._shared_context = None
+                else:
+                    await browser.close()
+                if self._http is not None:
+                    await self._http.aclose()
+                    self._http = None
+                if self._results_fp is not None:
+                    self._close_results()
+
+    def iter_records(self) -> Iterator[Dict]:
+        # Full records in completion order; read back one line at a time when they were streamed to results_path.
+        # Records the file does not hold (streaming stopped on a write error) come from self.results
+        done = 0
+        if self._results_opened and os.path.exists(self.results_path):
+            with open(self.results_path, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rec = loads_json(line)
+                    except ValueError:
+                        # Cut off by the failed write
+                        break
+                    done += 1
+                    yield rec
+        for r in self.results[done:]:
+            yield r.to_dict()
 
     def to_json(self) -> List[Dict]:
-        return [asdict(r) for r in self.results]
+        return list(self.iter_records())
+
+    def stream_json(self, fp, indent: int = 0) -> None:
+        # Writes the same document as dumping to_json(), one record at a time
+        sep = b"["
+        if indent:
+            pad = b"\n" + b" " * indent
+            for rec in self.iter_records():
+                # JSON strings never contain raw newlines, so this only re-indents structure
+                fp.write(sep + pad + dumps_json(rec, indent).replace(b"\n", pad))
+                sep = b","
+            fp.write(b"[]" if sep == b"[" else b"\n]")
+        else:
+            for rec in self.iter_records():
+                fp.write(sep + dumps_json(rec))
+                sep = b","
+            fp.write(b"[]" if sep == b"[" else b"]")
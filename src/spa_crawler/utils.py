@@ -1,30 +1,66 @@
+import json
+from functools import lru_cache
+from typing import Optional, Tuple
 from urllib.parse import urlparse, urljoin, urlunparse, parse_qsl, urlencode
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+@lru_cache(maxsize=65536)
 def canonicalize(url: str) -> str:
+    # Called for every discovered link, and sites link the same URLs from every page
     if not url:
         return ""
     p = urlparse(url)
     scheme = p.scheme.lower()
-    netloc = p.hostname.lower() if p.hostname else ""
-    if p.port and not ((scheme == "http" and p.port == 80) or (scheme == "https" and p.port == 443)):
-        netloc = f"{netloc}:{p.port}"
+    # hostname/port re-parse netloc on every access, so read each once; hostname is already lowercase
+    netloc = p.hostname or ""
+    port = p.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        netloc = f"{netloc}:{port}"
     path = p.path or "/"
+    if not p.query:
+        return urlunparse((scheme, netloc, path, "", "", ""))
     query_pairs = sorted(parse_qsl(p.query, keep_blank_values=True))
     query = urlencode(query_pairs, doseq=True)
     return urlunparse((scheme, netloc, path, "", query, ""))
 
 def same_origin(a: str, b: str) -> bool:
+    # URLs without a hostname (invalid URLs) never match
+    ka = origin_key(a)
+    return ka is not None and ka == origin_key(b)
+
+@lru_cache(maxsize=4096)
+def origin_key(url: str) -> Optional[Tuple[str, str, int]]:
+    # (scheme, host, port) with the scheme's default port filled in; None when there is no host
     try:
-        pa, pb = urlparse(a), urlparse(b)
-        # Handle cases where hostname might be None (invalid URLs)
-        if not pa.hostname or not pb.hostname:
-            return False
-        return (pa.scheme.lower(), pa.hostname.lower(), pa.port or 80) == (pb.scheme.lower(), pb.hostname.lower(), pb.port or 80)
+        p = urlparse(url)
+        if not p.hostname:
+            return None
+        scheme = p.scheme.lower()
+        return (scheme, p.hostname.lower(), p.port or (443 if scheme == "https" else 80))
     except Exception:
-        return False
+        return None
 
 def absolutize(base_url: str, href: str) -> str:
     try:
         return urljoin(base_url, href)
     except Exception:
         return ""
+
+def loads_json(data):
+    # Both parsers accept bytes and decode UTF-8 themselves, skipping a str copy of the input
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_json(obj, indent: int = 0) -> bytes:
+    # UTF-8 encoded JSON; orjson only knows 2-space indentation, other widths use the stdlib
+    if orjson is not None and indent in (0, 2):
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=indent, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")